@@ -1,4 +1,5 @@
 import shutil
+import traceback
 import subprocess
 
 from ansible_collections.unity.general.plugins.callback.deduped_default import (
@@ -8,7 +9,10 @@ from ansible_collections.unity.general.plugins.plugin_utils.bitwarden_redact imp
 from ansible_collections.unity.general.plugins.plugin_utils.buffered_callback import (
     BufferedCallback,
 )
-from ansible_collections.unity.general.plugins.plugin_utils.color import decolorize
+from ansible_collections.unity.general.plugins.plugin_utils.color import (
+    ansi_to_html,
+    ansi_to_plain_html,
+)
 from ansible_collections.unity.general.plugins.plugin_utils.dedupe_callback import (
     VALID_STATUSES,
     DiffID,
@@ -22,7 +26,7 @@ DOCUMENTATION = r"""
   short_description: No output if nothing interesting happened. HTML output for cron email.
   version_added: 2.18.1
   description: |
-    * ANSI text is converted to HTML using aha
+    * ANSI text is converted to HTML using aha, or a builtin converter if aha is not installed
     * at the end of the task, print the list of hosts that returned each status.
     * for the \"changed\" status, group any identical diffs and print the list of hosts which
       generated that diff. If a runner returns changed=true but no diff, a \"no diff\" message
@@ -46,7 +50,9 @@ DOCUMENTATION = r"""
     * async tasks are not allowed.
   requirements:
     - whitelist in configuration
-    - aha
+    - aha (optional)
+    - L(pyahocorasick,https://pypi.org/project/pyahocorasick/) (optional, faster redact_bitwarden)
+    - L(orjson,https://pypi.org/project/orjson/) (optional, faster redact_bitwarden)
   options:
     redact_bitwarden:
       description: check bitwarden cache file for secrets and remove them from task results
@@ -136,10 +142,17 @@ class CallbackModule(DedupedDefaultCallback, BufferedCallback):
         result_gist: ResultGist,
         gist_dupes: list[ResultID],
     ) -> None:
-        if self.get_option("redact_bitwarden"):
-            stripped_result_dict = bitwarden_redact(stripped_result_dict, self.get_options())
-            result_gist = ResultGist(**bitwarden_redact(result_gist, self.get_options()))
-        self._real_display.v(f"{result_id}: {stripped_result_dict}")
+        # most results are never displayed, so they don't need to be redacted
+        is_displayed = self._is_result_displayed(result_gist)
+        is_logged = self._real_display.verbosity >= 1
+        if self.get_option("redact_bitwarden") and (is_displayed or is_logged):
+            # one call so that the cache is checked and the string is scanned only once
+            stripped_result_dict, result_gist_dict = bitwarden_redact(
+                [stripped_result_dict, result_gist], self.get_options()
+            )
+            result_gist = ResultGist(**result_gist_dict)
+        if is_logged:
+            self._real_display.v(f"{result_id}: {stripped_result_dict}")
         return super().deduped_result(result_id, stripped_result_dict, result_gist, gist_dupes)
 
     def deduped_task_end(
@@ -163,15 +176,22 @@ class CallbackModule(DedupedDefaultCallback, BufferedCallback):
             self._real_display.warning("cron: no playbook output to print!")
             return
         if shutil.which("aha") is None:
-            self._real_display.warning("cron: aha not found!")
-            html = f"<html><body><pre>{decolorize(self._display.buffer)}</pre></body></html>"
+            self._real_display.v("cron: aha not found, using builtin ANSI to HTML converter")
+            try:
+                html = ansi_to_html(self._display.buffer).decode("utf8")
+            except Exception as e:
+                self._real_display.vvv(traceback.format_exc())
+                self._real_display.warning(
+                    f"cron: failed to convert ANSI to HTML, colors will be removed. {e}"
+                )
+                html = ansi_to_plain_html(self._display.buffer).decode("utf8")
         else:
             aha_proc = subprocess.Popen(
                 ["aha", "--black"],
                 stdin=subprocess.PIPE,
                 stdout=subprocess.PIPE,
                 stderr=subprocess.STDOUT,
-                text=True,
             )
-            html, _ = aha_proc.communicate(input=self._display.buffer)
+            html_bytes, _ = aha_proc.communicate(input=self._display.buffer)
+            html = html_bytes.decode("utf8")
         self._real_display.display(html)
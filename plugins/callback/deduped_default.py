@@ -128,9 +128,20 @@ class CallbackModule(DedupeCallback, FormatDiffCallback, DefaultCallback):
             self.textwrapper.width = width
         self.textwrapper.initial_indent = indent
         self.textwrapper.subsequent_indent = indent
+        max_line_length = self.textwrapper.width - len(indent)
         output_chunks = []  # with replace_whitespace=False, wrapper cannot properly indent newlines in input
         for line in x.splitlines():
-            output_chunks.append("\n".join(self.textwrapper.wrap(line)))
+            # most lines already fit. TextWrapper would only add the indent to these, but it
+            # would still split them into chunks and put them back together
+            if (
+                line
+                and len(line) <= max_line_length
+                and "\t" not in line
+                and not line[-1].isspace()
+            ):
+                output_chunks.append(indent + line)
+            else:
+                output_chunks.append("\n".join(self.textwrapper.wrap(line)))
         return "\n".join(output_chunks)
 
     @beartype
@@ -235,7 +246,7 @@ class CallbackModule(DedupeCallback, FormatDiffCallback, DefaultCallback):
         return f"{status}:\n{result_ids_str_wrapped} =>\n{msg_wrapped}"
 
     @beartype
-    def deduped_update_status_totals(self, status_totals: dict[str, str], final=False):
+    def deduped_update_status_totals(self, status_totals: dict[str, int | None], final=False):
         pass
 
     def _is_result_printed_immediately(self, gist: ResultGist) -> bool:
@@ -245,6 +256,16 @@ class CallbackModule(DedupeCallback, FormatDiffCallback, DefaultCallback):
             return True
         return False
 
+    def _is_result_displayed(self, gist: ResultGist) -> bool:
+        "whether deduped_result will display this result"
+        if not self._is_result_printed_immediately(gist):
+            return False
+        if gist["status"] == "ok" and not self.get_option("display_ok_hosts"):
+            return False
+        if gist["status"] == "skipped" and not self.get_option("display_skipped_hosts"):
+            return False
+        return True
+
     @beartype
     def deduped_result(
         self,
@@ -253,13 +274,12 @@ class CallbackModule(DedupeCallback, FormatDiffCallback, DefaultCallback):
         result_gist: ResultGist,
         gist_dupes: list[ResultID],
     ) -> None:
-        if not self._is_result_printed_immediately(result_gist):
-            return
-        if result_gist["status"] == "ok" and not self.get_option("display_ok_hosts"):
-            return
-        if result_gist["status"] == "skipped" and not self.get_option("display_skipped_hosts"):
+        if not self._is_result_displayed(result_gist):
             return
         self._ensure_banner_printed()
+        # the dict may have come straight from bitwarden_redact, which doesn't always copy.
+        # only top level keys are removed below, so a shallow copy is enough
+        stripped_result_dict = dict(stripped_result_dict)
         self._clean_results(stripped_result_dict, result_gist["task_action"])
         if "results" in stripped_result_dict and not result_gist["is_verbose"]:
             del stripped_result_dict["results"]
@@ -292,7 +312,7 @@ class CallbackModule(DedupeCallback, FormatDiffCallback, DefaultCallback):
     ):
         # Largest groupings last
         sorted_diffs_and_groupings = sorted(diffs_and_groupings, key=lambda x: len(x[1]))
-        for diff, diff_ids in sorted_diffs_and_groupings:
+        for i, (diff, diff_ids) in enumerate(sorted_diffs_and_groupings):
             # convert DiffID to ResultID, discarding index
             result_ids = [ResultID(x.hostname, x.item_label) for x in diff_ids]
             self._ensure_banner_printed()
@@ -301,20 +321,21 @@ class CallbackModule(DedupeCallback, FormatDiffCallback, DefaultCallback):
                 self.format_status_result_ids_msg("changed", result_ids),
                 color=C.COLOR_CHANGED,
             )
-            if diff != sorted_diffs_and_groupings[-1][0]:  # if not the last diff
+            if i < len(sorted_diffs_and_groupings) - 1:  # if not the last diff
                 self._display.display("")  # extra line to separate diffs
 
         # sort by status, then by grouping size, then by first resultID in grouping
         sorted_gists_and_groupings = sorted(
             result_gists_and_groupings, key=lambda x: [x[0]["status"], len(x[1]), str(x[1][0])]
         )
+        # diffs already printed, and result messages are copied into diffs
+        statuses_to_skip = {"changed"}
+        if not self.get_option("display_ok_hosts"):
+            statuses_to_skip.add("ok")
+        if not self.get_option("display_skipped_hosts"):
+            statuses_to_skip.add("skipped")
         for result_gist, result_ids in sorted_gists_and_groupings:
-            # diffs already printed, and result messages are copied into diffs
-            if result_gist["status"] == "changed":
-                continue
-            if result_gist["status"] == "ok" and not self.get_option("display_ok_hosts"):
-                continue
-            if result_gist["status"] == "skipped" and not self.get_option("display_skipped_hosts"):
+            if result_gist["status"] in statuses_to_skip:
                 continue
             already_printed = self._is_result_printed_immediately(result_gist)
             if already_printed:
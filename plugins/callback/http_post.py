@@ -1,22 +1,29 @@
 import pwd
 import os
-import re
 import sys
+import time
+import gzip
+import queue
+import atexit
 import socket
+import functools
 import shutil
+import tempfile
+import threading
 import traceback
 import subprocess
-from io import BytesIO
-from datetime import datetime, timezone
-from requests.exceptions import SSLError
-
-import requests
+from typing import IO
+from concurrent.futures import Future, ThreadPoolExecutor
 
 from ansible.playbook import Playbook
 from ansible.playbook.play import Play
 from ansible.errors import AnsibleError
-from ansible.executor.task_result import TaskResult
-from ansible_collections.unity.general.plugins.plugin_utils import slack_report_cache
+from ansible.utils.display import Display
+from ansible_collections.unity.general.plugins.plugin_utils.color import (
+    ansi_to_html,
+    ansi_to_plain_html,
+)
+from ansible_collections.unity.general.plugins.plugin_utils.slack_web_client import get_web_client
 from ansible_collections.unity.general.plugins.plugin_utils.bitwarden_redact import (
     bitwarden_redact,
 )
@@ -29,13 +36,17 @@ from ansible_collections.unity.general.plugins.plugin_utils.buffered_callback im
     BufferedCallback,
 )
 
+display = Display()
+
 DOCUMENTATION = r"""
   name: http_post
   type: notification
   short_description: upload HTMl formatted log to HTTP server
   version_added: 2.18.1
   description: |
-    * ANSI text is converted to HTML using aha
+    * ANSI text is converted to HTML using a builtin converter, or aha if the use_aha option is set
+    * if download_url is not set, the upload and the slack message are done in a background thread
+      so that they don't delay the end of the playbook. ansible waits for them to finish before exiting.
     * nothing is printed unless one of the results is changed or failed
     * at the end of the task, print the list of hosts that returned each status.
     * for the \"changed\" status, group any identical diffs and print the list of hosts which
@@ -60,9 +71,11 @@ DOCUMENTATION = r"""
     * async tasks are not allowed.
   requirements:
     - whitelist in configuration
-    - L(aha,https://github.com/theZiz/aha)
+    - L(aha,https://github.com/theZiz/aha) (optional, for use_aha)
     - L(requests,https://pypi.org/project/requests/)
     - L(slack-sdk,https://pypi.org/project/slack-sdk/) (optional)
+    - L(pyahocorasick,https://pypi.org/project/pyahocorasick/) (optional, faster redact_bitwarden)
+    - L(orjson,https://pypi.org/project/orjson/) (optional, faster redact_bitwarden)
     - HTTPS web server that allows file upload
   options:
     enable:
@@ -111,6 +124,29 @@ DOCUMENTATION = r"""
           key: upload_filename
       env:
         - name: CALLBACK_HTTP_POST_UPLOAD_FILENAME
+    use_aha:
+      description: |
+        convert ANSI text to HTML using aha rather than the builtin converter.
+        the builtin converter is used anyway if aha is not found.
+      type: bool
+      default: false
+      ini:
+        - section: callback_http_post
+          key: use_aha
+      env:
+        - name: CALLBACK_HTTP_POST_USE_AHA
+    compress_upload:
+      description: |
+        gzip compress the HTML before uploading it, and append ".gz" to the file name.
+        ansible logs usually compress very well. your web server should serve these files
+        with "Content-Encoding: gzip" so that browsers can display them.
+      type: bool
+      default: false
+      ini:
+        - section: callback_http_post
+          key: compress_upload
+      env:
+        - name: CALLBACK_HTTP_POST_COMPRESS_UPLOAD
     download_url:
       description: |
         Python format string that makes the download URL for the uploaded file.
@@ -123,6 +159,17 @@ DOCUMENTATION = r"""
           key: download_url
       env:
         - name: CALLBACK_HTTP_POST_DOWNLOAD_URL
+    max_log_size:
+      description: |
+        maximum size of the log in bytes. when the log grows past this size, the oldest lines
+        are dropped. 0 means no limit.
+      type: int
+      default: 0
+      ini:
+        - section: callback_http_post
+          key: max_log_size
+      env:
+        - name: CALLBACK_HTTP_POST_MAX_LOG_SIZE
     slack_message:
       description: |
         Python format string that makes a message for slack. the unity.general.slack callback
@@ -162,8 +209,147 @@ DOCUMENTATION = r"""
     - unity.general.ramdisk_cache
 """
 
-# https://stackoverflow.com/a/14693789/18696276
-ANSI_REGEX = re.compile(r"\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])")
+# for upload_filename. this can't change while ansible is running
+_SHORT_HOSTNAME = socket.gethostname().split(".", 1)[0]
+
+# how many times to try sending a slack message when slack says we are being rate limited
+_SLACK_MAX_ATTEMPTS = 5
+
+# how long to wait at exit for an upload that was started in the background
+_BACKGROUND_UPLOAD_TIMEOUT_SECONDS = 300
+
+# logs at least this big are split up and converted to HTML by multiple aha processes at once
+_AHA_PARALLEL_MIN_BYTES = 5 * 1024 * 1024
+
+# ansible colors each line separately, so a line ending with this has no color state left over
+_SGR_RESET_EOL = b"\x1b[0m\n"
+
+
+@functools.lru_cache(maxsize=1)
+def _get_username() -> str:
+    "for upload_filename. looked up when it's needed since the uid may not have a passwd entry"
+    try:
+        return pwd.getpwuid(os.getuid()).pw_name
+    except KeyError:
+        return os.environ.get("USER") or os.environ.get("LOGNAME") or str(os.getuid())
+
+
+def _gzip(file: IO[bytes]) -> IO[bytes]:
+    "compress file into a new anonymous file, which is returned rewound. file is closed"
+    gzip_file = tempfile.TemporaryFile()
+    with file, gzip.GzipFile(fileobj=gzip_file, mode="wb", compresslevel=6) as gzip_writer:
+        shutil.copyfileobj(file, gzip_writer)
+    gzip_file.seek(0)
+    return gzip_file
+
+
+def _aha(ansi: bytes | bytearray | memoryview, *args: str) -> bytes:
+    aha_proc = subprocess.Popen(
+        ["aha", "--black", *args],
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+    )
+    html, _ = aha_proc.communicate(input=ansi)
+    return html
+
+
+def _split_at_sgr_resets(buffer: memoryview, num_chunks: int) -> list[memoryview]:
+    """
+    split the buffer into roughly `num_chunks` equal pieces, only where a line ends with an
+    SGR reset, so that each piece can be converted by aha without knowing about the others
+    """
+    chunks = []
+    chunk_size = len(buffer) // num_chunks
+    start = 0
+    while len(chunks) < num_chunks - 1:
+        split = buffer.obj.find(_SGR_RESET_EOL, start + chunk_size)
+        if split == -1:
+            break
+        split += len(_SGR_RESET_EOL)
+        chunks.append(buffer[start:split])
+        start = split
+    chunks.append(buffer[start:])
+    return chunks
+
+
+def _aha_parallel(buffer: bytearray, html_file: IO[bytes], num_workers: int) -> None:
+    # aha's output for empty input is just the header and the footer
+    header_and_footer = _aha(b"")
+    footer_index = header_and_footer.rindex(b"</pre>")
+    with memoryview(buffer) as buffer_view:
+        chunks = _split_at_sgr_resets(buffer_view, num_workers)
+        try:
+            with ThreadPoolExecutor(max_workers=len(chunks)) as executor:
+                html_chunks = executor.map(lambda x: _aha(x, "--no-header"), chunks)
+                html_file.write(header_and_footer[:footer_index])
+                for html_chunk in html_chunks:
+                    html_file.write(html_chunk)
+                html_file.write(header_and_footer[footer_index:])
+        finally:
+            # the buffer can't be resized while any views of it exist
+            for chunk in chunks:
+                chunk.release()
+
+
+class _UploadWorker(threading.Thread):
+    """
+    runs uploads one at a time in the background with one HTTP session, so that connections
+    are kept alive between uploads. each upload function is called with the session as its
+    first argument.
+    """
+
+    def __init__(self):
+        super().__init__(daemon=True)
+        # requests is only imported once there is something to upload
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.queue = queue.Queue(maxsize=64)
+        self.session = requests.Session()
+        self.session.mount("https://", HTTPAdapter(pool_maxsize=4))
+
+    def submit(self, func, *args) -> Future:
+        future = Future()
+        self.queue.put((future, func, args))
+        return future
+
+    def run(self):
+        while True:
+            future, func, args = self.queue.get()
+            try:
+                if future.set_running_or_notify_cancel():
+                    try:
+                        future.set_result(func(self.session, *args))
+                    except BaseException as e:
+                        future.set_exception(e)
+            finally:
+                self.queue.task_done()
+
+    def flush(self, timeout: float) -> None:
+        "wait for queued uploads to finish. queue.Queue.join doesn't take a timeout."
+        deadline = time.monotonic() + timeout
+        with self.queue.all_tasks_done:
+            while self.queue.unfinished_tasks:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    display.warning(
+                        f"http_post: upload did not finish within {timeout} seconds, giving up."
+                    )
+                    return
+                self.queue.all_tasks_done.wait(remaining)
+
+
+_upload_worker = None
+
+
+def _get_upload_worker() -> _UploadWorker:
+    global _upload_worker
+    if _upload_worker is None:
+        _upload_worker = _UploadWorker()
+        _upload_worker.start()
+        atexit.register(_upload_worker.flush, _BACKGROUND_UPLOAD_TIMEOUT_SECONDS)
+    return _upload_worker
 
 
 class CallbackModule(DedupedDefaultCallback, BufferedCallback):
@@ -173,7 +359,6 @@ class CallbackModule(DedupedDefaultCallback, BufferedCallback):
     CALLBACK_NEEDS_WHITELIST = True
 
     def _send_slack_message(self, msg: str) -> None:
-        from slack_sdk import WebClient
         from slack_sdk.errors import SlackApiError
 
         token = self.get_option("slack_bot_user_oauth_token")
@@ -184,14 +369,25 @@ class CallbackModule(DedupedDefaultCallback, BufferedCallback):
         assert (
             channel_id is not None
         ), "slack_channel_id option is required when slack_message option is defined"
-        try:
-            web_client = WebClient(token=token)
-            web_client.chat_postMessage(channel=channel_id, text=msg)
-        except SlackApiError as e:
-            self._real_display.vvv(traceback.format_exc())
-            self._real_display.warning(
-                f"slack: failed to send message!\nerror: {e}\nmessage: {msg}"
-            )
+        web_client = get_web_client(token)
+        for attempt in range(_SLACK_MAX_ATTEMPTS):
+            try:
+                web_client.chat_postMessage(channel=channel_id, text=msg)
+                return
+            except SlackApiError as e:
+                # HTTP 429 means rate limited, slack says how long to wait in the Retry-After header
+                if e.response.status_code == 429 and attempt < _SLACK_MAX_ATTEMPTS - 1:
+                    headers = e.response.headers
+                    retry_after = headers.get("Retry-After", headers.get("retry-after"))
+                    delay = int(retry_after) if retry_after is not None else 2**attempt
+                    self._real_display.v(f"slack: rate limited, retrying in {delay} seconds...")
+                    time.sleep(delay)
+                    continue
+                self._real_display.vvv(traceback.format_exc())
+                self._real_display.warning(
+                    f"slack: failed to send message!\nerror: {e}\nmessage: {msg}"
+                )
+                return
 
     def __init__(self):
         super(CallbackModule, self).__init__()
@@ -209,9 +405,13 @@ class CallbackModule(DedupedDefaultCallback, BufferedCallback):
         result_gist: ResultGist,
         gist_dupes: list[ResultID],
     ) -> None:
-        if self.get_option("redact_bitwarden"):
-            stripped_result_dict = bitwarden_redact(stripped_result_dict, self.get_options())
-            result_gist = ResultGist(**bitwarden_redact(result_gist, self.get_options()))
+        # most results are never displayed, so they don't need to be redacted
+        if self.get_option("redact_bitwarden") and self._is_result_displayed(result_gist):
+            # one call so that the cache is checked and the string is scanned only once
+            stripped_result_dict, result_gist_dict = bitwarden_redact(
+                [stripped_result_dict, result_gist], self.get_options()
+            )
+            result_gist = ResultGist(**result_gist_dict)
         return super().deduped_result(result_id, stripped_result_dict, result_gist, gist_dupes)
 
     def deduped_playbook_on_end(self):
@@ -227,35 +427,99 @@ class CallbackModule(DedupedDefaultCallback, BufferedCallback):
                 "http_post: log not uploaded because all plays were run in check mode. this can be forced using the 'upload_check_mode' option."
             )
             return
+        if self._display.num_bytes_dropped:
+            self._real_display.warning(
+                f"http_post: the first {self._display.num_bytes_dropped} bytes of the log were dropped due to the 'max_log_size' option."
+            )
         filename = self.get_option("upload_filename").format(
-            timestamp=datetime.now(timezone.utc).timestamp(),
+            timestamp=time.time(),
             playbook_name=self._playbook_name,
-            username=pwd.getpwuid(os.getuid())[0],
-            hostname=socket.gethostname().split(".", 1)[0],
+            username=_get_username(),
+            hostname=_SHORT_HOSTNAME,
         )
-        if shutil.which("aha") is None:
-            self._real_display.warning("http_post: aha not found!")
-            html_bytes = (
-                "<html><body><pre>"
-                + re.sub(ANSI_REGEX, "", self._display.buffer)
-                + "</pre></body></html>"
-            ).encode()
+        if self.get_option("compress_upload"):
+            filename += ".gz"
+        # the HTML goes to an anonymous file rather than the python heap. aha writes to it directly
+        # and requests reads it back when it builds the request body.
+        html_file = tempfile.TemporaryFile()
+        use_aha = self.get_option("use_aha")
+        if use_aha and shutil.which("aha") is None:
+            self._real_display.warning(
+                "http_post: aha not found! using builtin ANSI to HTML converter"
+            )
+            use_aha = False
+        if not use_aha:
+            try:
+                html_file.write(ansi_to_html(self._display.buffer))
+            except Exception as e:
+                self._real_display.vvv(traceback.format_exc())
+                self._real_display.warning(
+                    f"http_post: failed to convert ANSI to HTML, colors will be removed. {e}"
+                )
+                html_file.write(ansi_to_plain_html(self._display.buffer))
+        elif (
+            len(self._display.buffer) >= _AHA_PARALLEL_MIN_BYTES and (os.cpu_count() or 1) > 1
+        ):
+            _aha_parallel(self._display.buffer, html_file, os.cpu_count())
         else:
             aha_proc = subprocess.Popen(
                 ["aha", "--black"],
                 stdin=subprocess.PIPE,
-                stdout=subprocess.PIPE,
+                stdout=html_file,
                 stderr=subprocess.STDOUT,
             )
             # TODO is utf8 okay?
-            html_bytes, _ = aha_proc.communicate(input=bytes(self._display.buffer, "utf8"))
+            aha_proc.communicate(input=self._display.buffer)
+        # the HTML is all in html_file now, so don't hold the log in memory during the upload
+        self._display.buffer = bytearray()
+        html_file.seek(0)
+        download_url = self.get_option("download_url")
+        slack_message = self.get_option("slack_message")
+        if download_url:
+            download_url = download_url.format(filename=filename)
+        if slack_message:
+            slack_message = slack_message.format(download_url=download_url)
+        upload_future = _get_upload_worker().submit(
+            self._upload_and_notify, filename, html_file, download_url, slack_message
+        )
+        upload_future.add_done_callback(self._report_background_upload_failure)
+        if download_url:
+            # the download URL should be printed with the rest of the playbook output, and only
+            # once the upload has succeeded. failures are reported by the done callback.
+            upload_future.exception()
+
+    def _upload_and_notify(
+        self,
+        session: "requests.Session",
+        filename: str,
+        html_file: IO[bytes],
+        download_url: str | None,
+        slack_message: str | None,
+    ) -> None:
+        "the download URL is only printed and the slack message only sent if the upload succeeds"
+        self._upload(session, filename, html_file)
+        if download_url:
+            self._real_display.display(f'http_post: download_url: "{download_url}".')
+        if slack_message:
+            self._send_slack_message(slack_message)
+
+    def _upload(self, session: "requests.Session", filename: str, html_file: IO[bytes]) -> None:
+        "html_file is closed when the upload is done"
+        from requests.exceptions import SSLError
+
         upload_url = self.get_option("upload_url")
+        content_type = "text/html"
+        if self.get_option("compress_upload"):
+            # done here rather than before submitting the upload so that it's also in the background
+            html_file = _gzip(html_file)
+            content_type = "application/gzip"
         self._real_display.v(f'http_post: uploading... file "{filename}" to "{upload_url}"')
         try:
-            response = requests.post(
-                upload_url,
-                files={"file": (filename, BytesIO(html_bytes), "text/html")},
-            )
+            with html_file:
+                response = session.post(
+                    upload_url,
+                    files={"file": (filename, html_file, content_type)},
+                )
         except SSLError as e:
             if "SSLCertVerificationError" in str(e):
                 raise type(e)(
@@ -270,16 +534,21 @@ class CallbackModule(DedupedDefaultCallback, BufferedCallback):
                 f'http_post: status_code={response.status_code}, reason="{response.reason}"\nUse -v to see response text.'
             )
         self._real_display.v("http_post: done.")
-        if download_url := self.get_option("download_url"):
-            download_url = download_url.format(filename=filename)
-            self._real_display.display(f'http_post: download_url: "{download_url}".')
-        if slack_message := self.get_option("slack_message"):
-            msg = slack_message.format(download_url=download_url)
-            self._send_slack_message(msg)
+
+    def _report_background_upload_failure(self, upload_future: Future) -> None:
+        # nobody calls result() on a background upload, so exceptions have to be reported here
+        if (e := upload_future.exception()) is not None:
+            self._real_display.vvv("".join(traceback.format_exception(e)))
+            self._real_display.warning(f"http_post: failed to upload log! {e}")
 
     def deduped_playbook_on_start(self, playbook: Playbook) -> None:
         super(CallbackModule, self).deduped_playbook_on_start(playbook)
         self._playbook_name = os.path.basename(playbook._file_name)
+        self._display.max_bytes = self.get_option("max_log_size")
+        if not self.get_option("enable"):
+            # nothing will be uploaded, so don't format and buffer output for every result.
+            # ansible doesn't send any more callbacks to a plugin that sets this attribute.
+            self.disabled = True
 
     def deduped_playbook_on_play_start(self, play: Play) -> None:
         super(CallbackModule, self).deduped_playbook_on_play_start(play)
@@ -1,14 +1,11 @@
 import traceback
 
-from slack_sdk import WebClient
-from slack_sdk.errors import SlackApiError
-
 from ansible.utils.display import Display
-from ansible.plugins.callback import CallbackBase
 from ansible.module_utils.common.text.converters import to_text
 
 from ansible_collections.unity.general.plugins.plugin_utils.dedupe_callback import DedupeCallback
 from ansible_collections.unity.general.plugins.plugin_utils import slack_report_cache
+from ansible_collections.unity.general.plugins.plugin_utils.slack_web_client import get_web_client
 
 
 display = Display()
@@ -51,10 +48,6 @@ class CallbackModule(DedupeCallback):
     CALLBACK_NAME = "unity.general.slack"
     CALLBACK_NEEDS_WHITELIST = True
 
-    def __init__(self):
-        super(CallbackModule, self).__init__()
-        self._text_buffer = []
-
     # https://github.com/ansible/ansible/pull/84496
     def get_options(self):
         return self._plugin_options
@@ -65,8 +58,11 @@ class CallbackModule(DedupeCallback):
         return "\n".join(report_lines)
 
     def _send_report(self, report: str) -> None:
+        # slack_sdk is slow to import, and most playbooks end without anything to report
+        from slack_sdk.errors import SlackApiError
+
         try:
-            web_client = WebClient(token=self.get_option("bot_user_oauth_token"))
+            web_client = get_web_client(self.get_option("bot_user_oauth_token"))
             web_client.chat_postMessage(channel=self.get_option("channel_id"), text=report)
         except SlackApiError as e:
             display.vvv(traceback.format_exc())
@@ -1,6 +1,11 @@
 import shutil
+import signal
+from bisect import bisect_right
+from itertools import accumulate
+from typing import no_type_check
 
 from ansible import constants as C
+from ansible.playbook import Playbook
 from ansible.utils.color import stringc
 from ansible_collections.unity.general.plugins.callback.deduped_default import (
     CallbackModule as DedupedDefaultCallback,
@@ -59,11 +64,31 @@ _STATUS_COLORS = {
     "unreachable": C.COLOR_UNREACHABLE,
 }
 
+# an arrow with white background to indicate that content was removed (`less -S`)
+_TRUNCATION_MARKER = "\033[30;47m>\033[0m"
 
-@beartype
+# stringc looks up the color code and formats it every time, but there are only a few statuses.
+# (prefix, suffix) that stringc would put around the text, empty if color is disabled
+_STATUS_SGR = {
+    status: tuple(stringc("\0", color).split("\0")) for status, color in _STATUS_COLORS.items()
+}
+
+
+# the status line is redrawn after every result, and get_terminal_size is a syscall,
+# so the width is only looked up again after the terminal is resized
+# "blanks" is a full line of spaces, sliced for padding instead of building a new string each time
+_tty_width_cache = {"width": None, "blanks": "", "clear_line": "\r\r"}
+
+
+# no beartype here or on the methods that run for every status line redraw.
+# the class level beartype skips methods marked with no_type_check
 def _tty_width() -> int:
-    output, _ = shutil.get_terminal_size()
-    return output
+    if _tty_width_cache["width"] is None:
+        width, _ = shutil.get_terminal_size()
+        _tty_width_cache["width"] = width
+        _tty_width_cache["blanks"] = " " * width
+        _tty_width_cache["clear_line"] = f"\r{' ' * width}\r"
+    return _tty_width_cache["width"]
 
 
 @beartype
@@ -75,64 +100,109 @@ class CallbackModule(DedupedDefaultCallback):
     @beartype
     def __init__(self):
         super(CallbackModule, self).__init__()
+        # what the status line was last drawn from, so that it isn't drawn again for nothing
+        self._last_status_line_key = None
+        self._statuses_to_ignore = frozenset()
+        self.original_sigwinch_handler = signal.getsignal(signal.SIGWINCH)
+        signal.signal(signal.SIGWINCH, self._sigwinch_handler)
+
+    def _sigwinch_handler(self, signum, frame):
+        _tty_width_cache["width"] = None
+        if callable(self.original_sigwinch_handler):
+            self.original_sigwinch_handler(signum, frame)
+
+    @no_type_check
+    def _write_to_terminal(self, x: str) -> None:
+        """
+        the status line is redrawn constantly and is meaningless once it's been overwritten, so it
+        isn't logged. it still goes through Display so that it can't interleave with other output
+        """
+        self._display.display(x, newline=False, screen_only=True)
 
-    @beartype
     def _clear_line(self):
-        self._display.display(f"\r{' ' * _tty_width()}\r", newline=False)
+        _tty_width()  # make sure the cache is populated
+        self._write_to_terminal(_tty_width_cache["clear_line"])
+        self._last_status_line_key = None
 
-    @beartype
-    def deduped_update_status_totals(self, status_totals: dict[str, str], final=False):
+    @no_type_check
+    def deduped_update_status_totals(self, status_totals: dict[str, int | None], final=False):
+        # loop tasks in particular send the same totals over and over
+        status_line_key = (tuple(status_totals.items()), _tty_width(), final)
+        if status_line_key == self._last_status_line_key:
+            return
+        self._last_status_line_key = status_line_key
+        component_delimiter = "  "
+        # colored "status=total" strings, and their printed lengths plus one trailing delimiter
         components = []
-        statuses_to_ignore = []
-        if not self.get_option("display_ok_hosts"):
-            statuses_to_ignore.append("ok")
-        if not self.get_option("display_skipped_hosts"):
-            statuses_to_ignore.append("skipped")
+        component_lengths = []
         for status, total in status_totals.items():
-            if status in statuses_to_ignore:
+            if status in self._statuses_to_ignore:
                 continue
-            color = _STATUS_COLORS[status]
-            if total == "0":
+            if total == 0:
                 continue
-            components.append((f"{status}={total}", color))
+            total_str = "?" if total is None else str(total)
+            prefix, suffix = _STATUS_SGR[status]
+            components.append(f"{prefix}{status}={total_str}{suffix}")
+            component_lengths.append(len(status) + 1 + len(total_str) + len(component_delimiter))
 
         # build a new list of components which, when printed, will not exceed the tty width
-        at_least_one_component_stripped = False
-        component_delimiter = "  "
-        components_stripped = []
-        components_stripped_length = 0
         tty_width = _tty_width()
-        for component, color in components:
-            if (components_stripped_length + len(component)) > tty_width:
-                at_least_one_component_stripped = True
-                break
-            components_stripped.append((component, color))
-            components_stripped_length += len(component) + len(component_delimiter)
-        if len(components_stripped) > 0:
+        # length of the line up to and including each component
+        cumulative_lengths = list(accumulate(component_lengths))
+        num_components_kept = bisect_right(cumulative_lengths, tty_width + len(component_delimiter))
+        at_least_one_component_stripped = num_components_kept < len(components)
+        components_stripped = components[:num_components_kept]
+        if num_components_kept > 0:
             # there's one trailing delimiter accounted for, remove it
-            components_stripped_length -= len(component_delimiter)
+            components_stripped_length = (
+                cumulative_lengths[num_components_kept - 1] - len(component_delimiter)
+            )
+        else:
+            components_stripped_length = 0
 
         if components_stripped_length < tty_width:
             num_trailing_spaces = tty_width - components_stripped_length
         else:
             num_trailing_spaces = 0
 
-        output = component_delimiter.join(
-            [stringc(component, color) for component, color in components_stripped]
-        )
-        output += " " * num_trailing_spaces
-        # add an arrow with white background to indicate that content was removed (`less -S`)
+        output = component_delimiter.join(components_stripped)
+        truncation_marker = ""
         if at_least_one_component_stripped:
-            output = output[:-1] + "\033[30;47m>\033[0m"
-        output += "\n" if final else "\r"
-        self._display.display(output, newline=False)
+            # the marker takes the place of the last character
+            truncation_marker = _TRUNCATION_MARKER
+            if num_trailing_spaces > 0:
+                num_trailing_spaces -= 1
+            else:
+                output = output[:-1]
+        output = "".join(
+            [
+                output,
+                _tty_width_cache["blanks"][:num_trailing_spaces],
+                truncation_marker,
+                "\n" if final else "\r",
+            ]
+        )
+        if final:
+            # this one stays on the screen, so it should be logged like anything else
+            self._display.display(output, newline=False)
+        else:
+            self._write_to_terminal(output)
 
     @beartype
+    def deduped_playbook_on_start(self, playbook: Playbook):
+        super(CallbackModule, self).deduped_playbook_on_start(playbook)
+        # the options don't change during a playbook, so don't look them up on every redraw
+        statuses_to_ignore = set()
+        if not self.get_option("display_ok_hosts"):
+            statuses_to_ignore.add("ok")
+        if not self.get_option("display_skipped_hosts"):
+            statuses_to_ignore.add("skipped")
+        self._statuses_to_ignore = frozenset(statuses_to_ignore)
+
     def deduped_result(self, *args, **kwargs):
         self._clear_line()  # destroy last status line
         DedupedDefaultCallback.deduped_result(self, *args, **kwargs)
 
-    @beartype
     def deduped_task_end(self, *args, **kwargs):
         self._clear_line()  # destroy last status line
         DedupedDefaultCallback.deduped_task_end(self, *args, **kwargs)
@@ -1,28 +1,38 @@
 import re
 from ansible.errors import AnsibleFilterError
 
+# CA header, port header, or attribute of a CA (one tab) or a port (two tabs)
+# one match per line rather than trying a regex for each kind of line in turn
+_IBSTAT_LINE_REGEX = re.compile(
+    r"CA '(?P<ca_name>.*)'|\tPort (?P<port_num>\d+):|(?P<tabs>\t{1,2})[^\t][^:]*:.*"
+)
+
 
 def parse_ibstat(_input: str) -> list[dict]:
     output = []
+    # the CA and port that attribute lines belong to
+    current_ca = None
+    current_port = None
     for i, line in enumerate(_input.splitlines()):
         if not line.strip():
             continue
-        if match := re.match(r"^CA '(.*)'$", line):
-            ca_name = match.groups(1)[0]
-            output.append({"CA name": ca_name, "ports": []})
-        elif match := re.match(r"^\tPort (\d+):$", line):
-            port_num = int(match.groups(1)[0])
-            output[-1]["ports"].append({"port number": port_num})
-        # line starts with exactly one tab
-        elif match := re.match(r"^\t[^\t]", line):
-            key, val = [x.strip() for x in line.split(":")]
-            output[-1][key] = val
-        # line starts with exactly two tabs
-        elif match := re.match(r"^\t{2}[^\t]", line):
-            key, val = [x.strip() for x in line.split(":")]
-            output[-1]["ports"][-1][key] = val
-        else:
+        match = _IBSTAT_LINE_REGEX.fullmatch(line)
+        if match is None:
             raise AnsibleFilterError(f"unable to parse line {i}. current output: {output}")
+        if (ca_name := match.group("ca_name")) is not None:
+            current_ca = {"CA name": ca_name, "ports": []}
+            current_port = None
+            output.append(current_ca)
+        elif (port_num := match.group("port_num")) is not None:
+            current_port = {"port number": int(port_num)}
+            current_ca["ports"].append(current_port)
+        else:
+            # values can contain colons too, only the first one separates key from value
+            key, _, val = line.partition(":")
+            if match.group("tabs") == "\t":
+                current_ca[key.strip()] = val.strip()
+            else:
+                current_port[key.strip()] = val.strip()
     return output
 
 
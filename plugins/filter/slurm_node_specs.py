@@ -75,7 +75,7 @@ The following terms are interchangable:
 
 import re
 import json
-import hashlib
+import functools
 import itertools
 from ClusterShell.NodeSet import NodeSet
 
@@ -109,60 +109,70 @@ def _fold_node_set(hostnames: list[str]) -> str:
     ["cpu001", "cpu002", "cpu003", "cpu006"] -> ["cpu[001-003,006]"]
     ["cpu001", "cpu002", "cpu003", "gpu001", "gpu002", "gpu003"] -> "cpu[001-003],gpu[001-003]"
     """
+    return _fold_node_set_cached(frozenset(hostnames))
+
+
+# the same groups of nodes are folded again by each pack(), and slurm_node_specs_merge packs
+# several times. order and duplicates don't matter to NodeSet, so the key is a frozenset
+@functools.lru_cache(maxsize=1024)
+def _fold_node_set_cached(hostnames: frozenset[str]) -> str:
     return str(NodeSet.fromlist(hostnames))
 
 
 @beartype
-def _get_dict_hash(x) -> str:
-    sorted_json_bytes = json.dumps(x, sort_keys=True).encode()
-    return hashlib.md5(sorted_json_bytes).hexdigest()
+def _get_dict_key(x) -> str:
+    """
+    equal dicts have equal keys. the key is only used for grouping within this process, so the
+    canonical JSON string itself is used rather than a digest of it
+    """
+    return json.dumps(x, sort_keys=True)
 
 
 @beartype
 def _group_nodes_equal_specs(node_specs: NodeSpecsUnpacked) -> dict[str, dict]:
-    confhash2conf = {}
-    confhash2hostnames = {}
+    confkey2conf = {}
+    confkey2hostnames = {}
     hostnames2conf = {}
+    # many nodes can share one specs dict (see pack), and those only need to be serialized once
+    specs_id2confkey = {}
     for hostname, specs in node_specs.items():
-        confhash = _get_dict_hash(specs)
-        confhash2conf[confhash] = specs
-        confhash2hostnames.setdefault(confhash, []).append(hostname)
-    for confhash, hostnames in confhash2hostnames.items():
+        if (confkey := specs_id2confkey.get(id(specs))) is None:
+            confkey = specs_id2confkey[id(specs)] = _get_dict_key(specs)
+        confkey2conf[confkey] = specs
+        confkey2hostnames.setdefault(confkey, []).append(hostname)
+    for confkey, hostnames in confkey2hostnames.items():
         node_set_str = _fold_node_set(hostnames)
-        hostnames2conf[node_set_str] = confhash2conf[confhash]
+        hostnames2conf[node_set_str] = confkey2conf[confkey]
     return hostnames2conf
 
 
+# a whole number, or any one other character
+_DIGITS_OR_CHAR_REGEX = re.compile(r"(\d+)|(.)", flags=re.DOTALL)
+# a '[' that starts a range of numbers in a NodeName list
+_BRACKET_BEFORE_DIGIT_REGEX = re.compile(r"\[(?=\d)")
+
+
+# the same hostnames and features are sorted over and over
+@functools.lru_cache(maxsize=None)
 @beartype
-def _make_string_sortable_numerically(string: str) -> list[tuple[int, int]]:
+def _make_string_sortable_numerically(string: str) -> tuple[tuple[int, int], ...]:
     """
     each character becomes a tuple of two ints. The first int is either 0,1, or 2
     0 for characters that come before numbers, 1 for numbers, 2 for after numbers
     the second int is the unicode value of the character, or the integer value of the number
     that this character is a part of.
                 $         7         8         9         a        ~
-    "$789a~" -> [[0, 36], [1, 789], [1, 789], [1, 789], [2, 97], [2, 126]]
+    "$789a~" -> ((0, 36), (1, 789), (1, 789), (1, 789), (2, 97), (2, 126))
     """
-    output = [[None, None] for _ in range(len(string))]
-    skip_these_indexes = [False] * len(string)
-    for i, char in enumerate(string):
-        if skip_these_indexes[i]:
-            continue
-        char_int = ord(char)
-        if char_int < ord("0"):
-            output[i] = (0, char_int)
-        elif str.isdigit(char):
-            first_digit_index = i
-            last_digit_index = i
-            while last_digit_index < len(string) - 1 and str.isdigit(string[last_digit_index + 1]):
-                last_digit_index += 1
-            this_number = int(string[first_digit_index : last_digit_index + 1])
-            for digit_index in range(first_digit_index, last_digit_index + 1):
-                skip_these_indexes[digit_index] = True
-                output[digit_index] = (1, this_number)
-        elif char_int > ord("9"):
-            output[i] = (2, char_int)
-    return output
+    output = []
+    for digits, char in _DIGITS_OR_CHAR_REGEX.findall(string):
+        if digits:
+            output += [(1, int(digits))] * len(digits)
+        elif char < "0":
+            output.append((0, ord(char)))
+        else:
+            output.append((2, ord(char)))
+    return tuple(output)
 
 
 @beartype
@@ -194,21 +204,28 @@ def _dict_sorted_keys_with_priority(_dict: dict, _priority_keys: list) -> dict:
 @beartype
 def pack(node_specs: NodeSpecsUnpacked) -> NodeSpecsPacked:
     _node_specs = {}
+    # unpack gives every node in a NodeName list the same specs dict, so each distinct dict only
+    # needs to be sorted once, and the nodes that shared it share the sorted copy
+    specs_id2sorted_specs = {}
     # sort spec values
     # WARNING: I assume that the order doesn't matter for all specs of type list
     for hostname, specs in node_specs.items():
-        _node_specs[hostname] = {}
+        if (sorted_specs := specs_id2sorted_specs.get(id(specs))) is not None:
+            _node_specs[hostname] = sorted_specs
+            continue
+        sorted_specs = _node_specs[hostname] = specs_id2sorted_specs[id(specs)] = {}
         for spec_name, spec_value in specs.items():
             if isinstance(spec_value, list):
-                if all(isinstance(x, str) for x in spec_value):
-                    _node_specs[hostname][spec_name] = sorted(
-                        node_specs[hostname][spec_name],
-                        key=_make_string_sortable_numerically,
+                # a list of strings can't be sorted with a list of anything else anyway,
+                # so only the first item is checked
+                if spec_value and isinstance(spec_value[0], str):
+                    sorted_specs[spec_name] = sorted(
+                        spec_value, key=_make_string_sortable_numerically
                     )
                 else:
-                    _node_specs[hostname][spec_name] = sorted(node_specs[hostname][spec_name])
+                    sorted_specs[spec_name] = sorted(spec_value)
             else:
-                _node_specs[hostname][spec_name] = spec_value
+                sorted_specs[spec_name] = spec_value
     # "pack" the specs
     node_specs_packed = []
     for name_list_str, specs in _group_nodes_equal_specs(_node_specs).items():
@@ -223,27 +240,35 @@ def pack(node_specs: NodeSpecsUnpacked) -> NodeSpecsPacked:
     return sorted(
         node_specs_packed,
         # ignore '[' such that cpu001 doesn't end up sorted after cpu[002-005]
-        key=lambda x: _make_string_sortable_numerically(re.sub(r"\[(\d)", r"\1", x["NodeName"])),
+        key=lambda x: _make_string_sortable_numerically(
+            _BRACKET_BEFORE_DIGIT_REGEX.sub("", x["NodeName"])
+        ),
     )
 
 
+# _cluster_memory unfolds NodeName lists that pack() has just folded, and the same lists recur
+# between unpack() calls. the result is a tuple so that callers can't modify the cached value
+@functools.lru_cache(maxsize=1024)
 @beartype
-def _unfold_node_set(hostnames: str) -> list[str]:
+def _unfold_node_set(hostnames: str) -> tuple[str, ...]:
     """
-    "cpu[001-003,006]" -> ["cpu001", "cpu002", "cpu003", "cpu006"]
-    "cpu[001-003],gpu[001-003]" -> ["cpu001", "cpu002", "cpu003", "gpu001", "gpu002", "gpu003"]
+    "cpu[001-003,006]" -> ("cpu001", "cpu002", "cpu003", "cpu006")
+    "cpu[001-003],gpu[001-003]" -> ("cpu001", "cpu002", "cpu003", "gpu001", "gpu002", "gpu003")
     """
-    return list(NodeSet(hostnames))
+    return tuple(NodeSet(hostnames))
 
 
 @beartype
-def _merge(dict1: dict, dict2: dict, path=None, allow_conflicts=False) -> dict:
+def _merge(dict1: dict, dict2: dict, path=None, allow_conflicts=False, in_place=False) -> dict:
+    """
+    in_place: modify and return dict1 rather than a copy. only the top level is modified, nested
+    dicts are still copied since _unpack shares one specs dict between many nodes
+    """
     # track the current path during recursion for a good error message
     if path is None:
         path = []
-    merged = dict(dict1)  # make a copy of the first dictionary
+    merged = dict1 if in_place else dict(dict1)
     for key, value in dict2.items():
-        current_path = path + [key]  # Update the current path
         if key not in dict1:
             merged[key] = value
         else:
@@ -253,17 +278,22 @@ def _merge(dict1: dict, dict2: dict, path=None, allow_conflicts=False) -> dict:
             # dict: recursive call
             if isinstance(value, dict) and isinstance(dict1[key], dict):
                 merged[key] = _merge(
-                    dict1[key], value, current_path, allow_conflicts=allow_conflicts
+                    dict1[key], value, path + [key], allow_conflicts=allow_conflicts
                 )
             # list: add dict2 list items to dict1 list if not already present
             elif isinstance(value, list) and isinstance(dict1[key], list):
-                merged[key] = list(dict1[key]) + [item for item in value if item not in dict1[key]]
+                try:
+                    existing_items = set(dict1[key])
+                    new_items = [x for x in value if x not in existing_items]
+                except TypeError:  # unhashable items in either list, just search the list
+                    new_items = [x for x in value if x not in dict1[key]]
+                merged[key] = list(dict1[key]) + new_items
             # else: error
             else:
                 if allow_conflicts:
                     merged[key] = dict2[key]
                 else:
-                    full_path = ".".join(map(str, current_path))
+                    full_path = ".".join(map(str, path + [key]))
                     msg = f"Conflict at '{full_path}': '{dict1[key]}' vs '{dict2[key]}'"
                     raise RuntimeError(msg)
     return merged
@@ -309,44 +339,49 @@ def unpack(node_specs: NodeSpecsPacked | list[NodeSpecsPacked]) -> dict[str, dic
     else:
         output = _unpack(node_specs[0])
         for specs in node_specs[1:]:
-            output = _merge(output, _unpack(specs))
+            # output is ours, so don't copy every node in it once per file
+            output = _merge(output, _unpack(specs), in_place=True)
     return output
 
 
-type _mem_iter = list[tuple[int, str]] | itertools.chain[tuple[int, str]]
-
-
 @beartype
-def __cluster_memory(sorted_memoryMB_hostname: _mem_iter, max_reduction: int) -> _mem_iter:
+def __cluster_memory(
+    sorted_memoryMB_hostname: list[tuple[int, str]], max_reduction: int
+) -> list[tuple[int, str]]:
     "cluster integers by reducing them by no more than max_reduction"
-    # if the entire range can be reduced to equal the lowest number without violating max_reduction
-    if sorted_memoryMB_hostname[-1][0] - sorted_memoryMB_hostname[0][0] <= max_reduction:
-        new_memoryMB = sorted_memoryMB_hostname[0][0]
-        output = []
-        reduction2hostnames = {}
-        for memoryMB, hostname in sorted_memoryMB_hostname:
-            output.append((new_memoryMB, hostname))
-            reduction = memoryMB - new_memoryMB
-            if reduction != 0:
-                reduction2hostnames.setdefault(reduction, []).append(hostname)
-        for reduction, hostnames in reduction2hostnames.items():
-            reduced_hostnames_folded = _fold_node_set(hostnames)
-            display.warning(
-                f"{reduced_hostnames_folded} RealMemory reduced by {reduction} MB to match {sorted_memoryMB_hostname[0][1]}"
-            )
-        return output
-    # divide and conquer. split the range at the biggest gap
-    # for each element, the corresponding gap is the distance between it and the previous element
-    gaps = [-1]
-    for i, (memoryMB, _) in enumerate(sorted_memoryMB_hostname[1:], start=1):
-        gaps.append(memoryMB - sorted_memoryMB_hostname[i - 1][0])
-    # https://stackoverflow.com/a/11825864/18696276
-    biggest_gap_index = max(range(len(gaps)), key=gaps.__getitem__)
-    # https://stackoverflow.com/a/1724975/18696276
-    return itertools.chain(
-        __cluster_memory(sorted_memoryMB_hostname[:biggest_gap_index], max_reduction),
-        __cluster_memory(sorted_memoryMB_hostname[biggest_gap_index:], max_reduction),
-    )
+    output = []
+    # the gap for each element is the distance between it and the previous element
+    # the list is sorted once up front, so the gaps only need to be computed once too
+    memoryMBs = [memoryMB for memoryMB, _ in sorted_memoryMB_hostname]
+    gaps = [-1] + [b - a for a, b in itertools.pairwise(memoryMBs)]
+    # divide and conquer, with a stack of [start, stop) index ranges rather than recursion
+    # the left range is always popped first so that the output stays sorted
+    ranges = [(0, len(sorted_memoryMB_hostname))]
+    while ranges:
+        start, stop = ranges.pop()
+        new_memoryMB, lowest_hostname = sorted_memoryMB_hostname[start]
+        # if the entire range can be reduced to equal the lowest number without violating
+        # max_reduction
+        if sorted_memoryMB_hostname[stop - 1][0] - new_memoryMB <= max_reduction:
+            reduction2hostnames = {}
+            for i in range(start, stop):
+                memoryMB, hostname = sorted_memoryMB_hostname[i]
+                output.append((new_memoryMB, hostname))
+                reduction = memoryMB - new_memoryMB
+                if reduction != 0:
+                    reduction2hostnames.setdefault(reduction, []).append(hostname)
+            for reduction, hostnames in reduction2hostnames.items():
+                reduced_hostnames_folded = _fold_node_set(hostnames)
+                display.warning(
+                    f"{reduced_hostnames_folded} RealMemory reduced by {reduction} MB to match {lowest_hostname}"
+                )
+            continue
+        # split the range at the biggest gap
+        # https://stackoverflow.com/a/11825864/18696276
+        biggest_gap_index = max(range(start + 1, stop), key=gaps.__getitem__)
+        ranges.append((biggest_gap_index, stop))
+        ranges.append((start, biggest_gap_index))
+    return output
 
 
 @beartype
@@ -1,49 +1,220 @@
+import os
+import re
 import json
-import datetime
+import stat
+import time
+import fcntl
 
 from ansible.utils.display import Display
 from ansible_collections.unity.general.plugins.plugin_utils.ramdisk_cache import (
     RamdiskCacheContextManager,
+    get_cache_path,
 )
 
 display = Display()
 
+try:
+    import ahocorasick
 
-def _get_bitwarden_secrets(plugin_options: dict):
+    DO_AHOCORASICK = True
+
+except ImportError:
+    display.debug("unable to import pyahocorasick. bitwarden secrets will be found with a regex.")
+
+    DO_AHOCORASICK = False
+
+try:
+    import orjson
+
+    DO_ORJSON = True
+
+except ImportError:
+    display.debug("unable to import orjson. bitwarden cache will be parsed with json.")
+
+    DO_ORJSON = False
+
+# secrets from the last time the bitwarden cache file was read, along with their automaton
+# (or regex if pyahocorasick is missing). key is the path, mtime and size of the cache file
+# at that time.
+_secrets_cache = {"key": None, "secrets": (), "automaton": None, "regex": None}
+
+
+def _read_bitwarden_secrets(cache_file) -> tuple[str, ...]:
+    """
+    unique, nonempty, longest first so that a secret is never partly redacted by a shorter secret
+    that it contains
+    """
+    try:
+        if DO_ORJSON:
+            # orjson takes the raw bytes, so skip the text layer and its UTF-8 decode
+            bitwarden_cache = orjson.loads(cache_file.buffer.read())
+        else:
+            bitwarden_cache = json.load(cache_file)
+    # orjson.JSONDecodeError is a subclass of json.JSONDecodeError
+    except json.JSONDecodeError as e:
+        display.debug(f"assuming bitwarden cache is empty due to json decode error: {str(e)}")
+        return ()
+    secrets = []
+    for value in bitwarden_cache.values():
+        if isinstance(value, list):
+            secrets += value
+        else:
+            secrets.append(value)
+    secrets = {x.strip() for x in secrets} - {""}
+    return tuple(sorted(secrets, key=len, reverse=True))
+
+
+def _build_automaton(secrets: tuple[str, ...]):
+    "returns None if there are no secrets to search for"
+    if not secrets:
+        return None
+    automaton = ahocorasick.Automaton()
+    for secret in secrets:
+        automaton.add_word(secret, secret)
+    automaton.make_automaton()
+    return automaton
+
+
+def _build_regex(secrets: tuple[str, ...]) -> re.Pattern | None:
+    "returns None if there are no secrets to search for"
+    if not secrets:
+        return None
+    # secrets are sorted longest first, so the longest secret wins when several start at one index
+    return re.compile("|".join(re.escape(x) for x in secrets))
+
+
+def _reuse_loaded_secrets(cache_path: str, plugin_options: dict) -> bool:
+    """
+    the checks from RamdiskCacheContextManager (caching enabled, ownership, permissions, timeout)
+    are done and the mtime is updated like it would, so that the secrets in memory expire along
+    with the file. returns False if the file must be read again
+    """
+    if _secrets_cache["key"] is None or plugin_options["enable_cache"] is False:
+        return False
+    try:
+        cache_file = open(cache_path, "rb")
+    except FileNotFoundError:
+        return False
+    with cache_file:
+        # writers hold an exclusive lock, so the file can't change between the stat and the utime
+        fcntl.flock(cache_file, fcntl.LOCK_SH)
+        cache_stat = os.fstat(cache_file.fileno())
+        cache_timeout_seconds = plugin_options["cache_timeout_seconds"]
+        if (
+            (cache_path, cache_stat.st_mtime_ns, cache_stat.st_size) != _secrets_cache["key"]
+            or cache_stat.st_uid != os.getuid()
+            or stat.S_IMODE(cache_stat.st_mode) != 0o600
+            or (
+                cache_timeout_seconds > 0
+                and (time.time_ns() - cache_stat.st_mtime_ns) / 1e9 > cache_timeout_seconds
+            )
+        ):
+            return False
+        os.utime(cache_file.fileno())
+        # the filesystem may store a coarser mtime than the current time, so stat it again
+        cache_stat = os.fstat(cache_file.fileno())
+        _secrets_cache["key"] = (cache_path, cache_stat.st_mtime_ns, cache_stat.st_size)
+    return True
+
+
+def _load_bitwarden_secrets(plugin_options: dict) -> None:
+    """
+    the cache file is only read again when its mtime or size has changed since the last read
+    """
+    cache_path = get_cache_path("bitwarden", plugin_options)
+    if _reuse_loaded_secrets(cache_path, plugin_options):
+        return
     with RamdiskCacheContextManager(
         "bitwarden", "bitwarden_redact", plugin_options, needs_write=False
     ) as cache_file:
-        try:
-            bitwarden_cache = json.load(cache_file)
-        except json.JSONDecodeError as e:
-            display.debug(f"assuming bitwarden cache is empty due to json decode error: {str(e)}")
-            return []
-        secrets = []
-        for value in bitwarden_cache.values():
-            if isinstance(value, list):
-                secrets += value
-            else:
-                secrets.append(value)
-    return [x.strip() for x in secrets]
+        secrets = _read_bitwarden_secrets(cache_file)
+        # opening the cache updates its mtime, so the key can't be taken until now
+        cache_stat = os.fstat(cache_file.fileno())
+        key = (cache_path, cache_stat.st_mtime_ns, cache_stat.st_size)
+    _secrets_cache["key"] = key
+    _secrets_cache["secrets"] = secrets
+    if DO_AHOCORASICK:
+        _secrets_cache["automaton"] = _build_automaton(secrets)
+    else:
+        _secrets_cache["regex"] = _build_regex(secrets)
+
+
+def _redact_ahocorasick(x: str) -> tuple[str, int]:
+    """
+    find all secrets in one pass over x and replace them with "REDACTED"
+    overlapping matches are redacted together
+    returns the redacted string and the number of distinct secrets that were found
+    the secrets must already be loaded
+    """
+    automaton = _secrets_cache["automaton"]
+    if automaton is None:
+        return x, 0
+    found_secrets = set()
+    spans = []
+    for end_index, secret in automaton.iter(x):
+        found_secrets.add(secret)
+        spans.append((end_index - len(secret) + 1, end_index + 1))
+    if not spans:
+        return x, 0
+    output = []
+    cursor = 0
+    for start, end in sorted(spans):
+        if start < cursor:
+            # overlaps with the previous secret, extend that redaction
+            cursor = max(cursor, end)
+            continue
+        output.append(x[cursor:start])
+        output.append("REDACTED")
+        cursor = end
+    output.append(x[cursor:])
+    return "".join(output), len(found_secrets)
 
 
-def bitwarden_redact(x: object, plugin_options: dict) -> str:
+def _redact_regex(x: str) -> tuple[str, int]:
+    """
+    replace all secrets in x with "REDACTED" in one pass
+    returns the redacted string and the number of distinct secrets that were found
+    the secrets must already be loaded
+    """
+    regex = _secrets_cache["regex"]
+    if regex is None:
+        return x, 0
+    found_secrets = set()
+
+    def _redact_match(match: re.Match) -> str:
+        found_secrets.add(match.group())
+        return "REDACTED"
+
+    return regex.sub(_redact_match, x), len(found_secrets)
+
+
+def bitwarden_redact(x: object, plugin_options: dict) -> object:
     """
     any secrets currently in bitwarden cache will be removed from object x
     x must be JSON serializable
 
     plugin_options is the result from AnsiblePlugin.get_options()
     your plugin must extend the unity.general.ramdisk_cache documentation fragment
+
+    if nothing is redacted, x itself is returned rather than a copy, so copy the result before
+    modifying it
     """
-    num_secrets_redacted = 0
-    start_time = datetime.datetime.now()
+    # stat the cache file once per call, not once per step
+    _load_bitwarden_secrets(plugin_options)
+    if not _secrets_cache["secrets"]:
+        return x
+    start_time = time.monotonic()
     x_json_str = json.dumps(x)
-    for secret in _get_bitwarden_secrets(plugin_options):
-        if secret in x_json_str:
-            x_json_str = x_json_str.replace(secret, "REDACTED")
-            num_secrets_redacted += 1
-    seconds_elapsed = (datetime.datetime.now() - start_time).total_seconds()
-    display.v(
-        f"it took {seconds_elapsed:.1f} seconds to remove {num_secrets_redacted} bitwarden secrets from a string of length {len(x)}."
-    )
+    x_json_str_len = len(x_json_str)
+    if DO_AHOCORASICK:
+        x_json_str, num_secrets_redacted = _redact_ahocorasick(x_json_str)
+    else:
+        x_json_str, num_secrets_redacted = _redact_regex(x_json_str)
+    if display.verbosity >= 1:
+        seconds_elapsed = time.monotonic() - start_time
+        display.v(
+            f"it took {seconds_elapsed:.1f} seconds to remove {num_secrets_redacted} bitwarden secrets from a string of length {x_json_str_len}."
+        )
+    if num_secrets_redacted == 0:
+        return x
     return json.loads(x_json_str)
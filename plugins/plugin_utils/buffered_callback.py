@@ -1,23 +1,30 @@
 import sys
-from io import StringIO
+from io import BytesIO, StringIO, TextIOWrapper
 from ansible.utils.display import Display
 from ansible.plugins.callback import CallbackBase
 from contextlib import redirect_stdout, redirect_stderr
 
 
-def capture(func, *args, **kwargs):
-    "redirect stdout and stderr to a StringIO and return the contents of that pipe as a string"
-    if isinstance(sys.stdout, StringIO):
+class _CaptureStream(TextIOWrapper):
+    "what stdout and stderr are redirected to by capture()"
+
+
+def capture(func, *args, **kwargs) -> bytes:
+    """
+    redirect stdout and stderr to a buffer and return the contents of that buffer as UTF-8 bytes
+    output is encoded as it is written rather than collected as a string and encoded afterwards
+    """
+    if isinstance(sys.stdout, (StringIO, _CaptureStream)):
         # if it's already captured, don't redirect
         func(*args, **kwargs)
-        return ""
-    buffer = StringIO()
-    with redirect_stdout(buffer):
-        with redirect_stderr(buffer):
+        return b""
+    buffer = BytesIO()
+    stream = _CaptureStream(buffer, encoding="utf8", newline="")
+    with redirect_stdout(stream):
+        with redirect_stderr(stream):
             func(*args, **kwargs)
-    buffer.flush()
-    buffer.seek(0)
-    return buffer.read()
+    stream.flush()
+    return buffer.getvalue()
 
 
 class Display2Buffer:
@@ -25,11 +32,18 @@ class Display2Buffer:
     overloads the Display class to capture what would be stdout/stderr output into a buffer
     this can't be done with normal inheritance because Display is a Singleton and this can't
     be a Singleton
+
+    the buffer is a bytearray of UTF-8 encoded output. appending to a str attribute with `+=`
+    copies the whole string every time, which is quadratic over the course of a playbook.
+
+    if max_bytes is nonzero, the oldest lines are dropped from the buffer to keep it about that size
     """
 
-    def __init__(self):
+    def __init__(self, max_bytes: int = 0):
         self._display = Display()
-        self.buffer = ""
+        self.buffer = bytearray()
+        self.max_bytes = max_bytes
+        self.num_bytes_dropped = 0
         functions_to_capture = [
             # this needs to be manually maintained
             # curl -s https://raw.githubusercontent.com/ansible/ansible/devel/lib/ansible/utils/display.py | grep '^    def' | sed -E 's/.*def (.*?)\(.*/"\1",/'
@@ -70,10 +84,26 @@ class Display2Buffer:
 
     def _make_captured_wrapper_function(self, attr_name):
         def _wrapper_function(*args, **kwargs):
-            self.buffer += capture(getattr(self._display, attr_name), *args, **kwargs)
+            self._append(capture(getattr(self._display, attr_name), *args, **kwargs))
 
         setattr(self, attr_name, _wrapper_function)
 
+    def _append(self, x: bytes) -> None:
+        self.buffer += x
+        # dropping lines means moving everything after them, so wait until the buffer is
+        # well over the limit rather than doing it on every append
+        if self.max_bytes and len(self.buffer) > self.max_bytes * 5 // 4:
+            cut = len(self.buffer) - self.max_bytes
+            newline_index = self.buffer.find(b"\n", cut)
+            if newline_index != -1:
+                cut = newline_index + 1
+            else:
+                # don't start the buffer in the middle of a multi-byte UTF-8 character
+                while cut < len(self.buffer) and 0x80 <= self.buffer[cut] <= 0xBF:
+                    cut += 1
+            del self.buffer[:cut]
+            self.num_bytes_dropped += cut
+
     def _make_wrapper_function(self, attr_name):
         def _wrapper_function(*args, **kwargs):
             return getattr(self._display, attr_name)(*args, **kwargs)
@@ -98,5 +128,5 @@ class BufferedCallback(CallbackBase):
         self._display = Display2Buffer()
 
     def display_buffer(self):
-        self._real_display.display(self._display.buffer)
-        self._display.buffer = ""
+        self._real_display.display(self._display.buffer.decode("utf8"))
+        self._display.buffer = bytearray()
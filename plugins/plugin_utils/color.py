@@ -2,7 +2,185 @@ import re
 
 # https://stackoverflow.com/a/14693789/18696276
 ANSI_REGEX = re.compile(r"\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])")
+ANSI_REGEX_BYTES = re.compile(rb"\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])")
+
+# xterm colors for SGR 30-37 and 90-97
+_COLORS_16 = [
+    "#000000",
+    "#cd0000",
+    "#00cd00",
+    "#cdcd00",
+    "#0000ee",
+    "#cd00cd",
+    "#00cdcd",
+    "#e5e5e5",
+    "#7f7f7f",
+    "#ff0000",
+    "#00ff00",
+    "#ffff00",
+    "#5c5cff",
+    "#ff00ff",
+    "#00ffff",
+    "#ffffff",
+]
+_CUBE_LEVELS = [0, 95, 135, 175, 215, 255]
+
+# parameter bytes that mark a private (non-SGR) sequence, like xterm's `CSI > 4 ; 2 m`
+_PRIVATE_PARAMETER_PREFIXES = b"<=>?"
+
+HTML_HEADER = (
+    b'<html><head><meta charset="utf-8"/></head>'
+    + b'<body style="background-color:black;color:white;"><pre>\n'
+)
+HTML_FOOTER = b"</pre></body></html>\n"
 
 
 def decolorize(x: str) -> str:
-    return re.sub(ANSI_REGEX, "", x)
+    # most output has no escape sequences at all when ansible isn't writing to a terminal
+    if "\x1b" not in x:
+        return x
+    return ANSI_REGEX.sub("", x)
+
+
+def _color_256(n: int) -> str:
+    if n < 16:
+        return _COLORS_16[n]
+    if n < 232:
+        n -= 16
+        r, g, b = _CUBE_LEVELS[n // 36], _CUBE_LEVELS[(n // 6) % 6], _CUBE_LEVELS[n % 6]
+        return f"#{r:02x}{g:02x}{b:02x}"
+    level = 8 + 10 * (n - 232)
+    return f"#{level:02x}{level:02x}{level:02x}"
+
+
+def _html_escape(x: bytes) -> bytes:
+    return x.replace(b"&", b"&amp;").replace(b"<", b"&lt;").replace(b">", b"&gt;")
+
+
+class _SgrState:
+    "the text attributes that have been set by SGR escape sequences so far"
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.fg = None
+        self.bg = None
+        self.bold = False
+        self.underline = False
+
+    def update(self, params: bytes) -> None:
+        if params[:1] and params[:1] in _PRIVATE_PARAMETER_PREFIXES:
+            return
+        codes = []
+        for param in params.split(b";"):
+            if b":" not in param:
+                if not param:
+                    codes.append(0)
+                elif param.isdigit():
+                    codes.append(int(param))
+                # anything else is not a parameter we understand, ignore it
+                continue
+            # colon sub-parameters: `4:3` curly underline, `38:5:196`, `38:2:[colorspace]:R:G:B`
+            if not all(x.isdigit() or not x for x in param.split(b":")):
+                continue
+            sub_params = [int(x) if x else 0 for x in param.split(b":")]
+            code = sub_params[0]
+            if code in (38, 48):
+                if sub_params[1:2] == [5] and len(sub_params) == 3:
+                    codes.extend(sub_params)
+                elif sub_params[1:2] == [2] and len(sub_params) in (5, 6):
+                    codes.extend(sub_params[:2] + sub_params[-3:])
+            elif code == 4:
+                codes.append(4 if sub_params[1] else 24)
+            else:
+                codes.append(code)
+        i = 0
+        while i < len(codes):
+            code = codes[i]
+            if code == 0:
+                self.reset()
+            elif code == 1:
+                self.bold = True
+            elif code == 22:
+                self.bold = False
+            elif code == 4:
+                self.underline = True
+            elif code == 24:
+                self.underline = False
+            elif 30 <= code <= 37:
+                self.fg = _COLORS_16[code - 30]
+            elif 90 <= code <= 97:
+                self.fg = _COLORS_16[code - 90 + 8]
+            elif code == 39:
+                self.fg = None
+            elif 40 <= code <= 47:
+                self.bg = _COLORS_16[code - 40]
+            elif 100 <= code <= 107:
+                self.bg = _COLORS_16[code - 100 + 8]
+            elif code == 49:
+                self.bg = None
+            elif code in (38, 48) and i + 1 < len(codes):
+                # extended color: 38;5;N or 38;2;R;G;B
+                if codes[i + 1] == 5 and i + 2 < len(codes):
+                    color = _color_256(codes[i + 2] % 256)
+                    i += 2
+                elif codes[i + 1] == 2 and i + 4 < len(codes):
+                    r, g, b = (x % 256 for x in codes[i + 2 : i + 5])
+                    color = f"#{r:02x}{g:02x}{b:02x}"
+                    i += 4
+                else:
+                    color = None
+                if code == 38:
+                    self.fg = color
+                else:
+                    self.bg = color
+            i += 1
+
+    def css(self) -> str:
+        output = ""
+        if self.fg is not None:
+            output += f"color:{self.fg};"
+        if self.bg is not None:
+            output += f"background-color:{self.bg};"
+        if self.bold:
+            output += "font-weight:bold;"
+        if self.underline:
+            output += "text-decoration:underline;"
+        return output
+
+
+def ansi_to_html(ansi: bytes | bytearray) -> bytes:
+    """
+    convert text with ANSI SGR color codes to an HTML document, similar to `aha --black`
+    escape sequences other than SGR are removed
+    """
+    if b"\x1b" not in ansi:
+        return b"".join([HTML_HEADER, _html_escape(bytes(ansi)), HTML_FOOTER])
+    output = [HTML_HEADER]
+    state = _SgrState()
+    span_open = False
+    cursor = 0
+    for match in ANSI_REGEX_BYTES.finditer(ansi):
+        output.append(_html_escape(ansi[cursor : match.start()]))
+        cursor = match.end()
+        sequence = match.group()
+        if not (sequence.startswith(b"\x1b[") and sequence.endswith(b"m")):
+            continue
+        state.update(sequence[2:-1])
+        if span_open:
+            output.append(b"</span>")
+            span_open = False
+        if css := state.css():
+            output.append(f'<span style="{css}">'.encode())
+            span_open = True
+    output.append(_html_escape(ansi[cursor:]))
+    if span_open:
+        output.append(b"</span>")
+    output.append(HTML_FOOTER)
+    return b"".join(output)
+
+
+def ansi_to_plain_html(ansi: bytes | bytearray) -> bytes:
+    "like ansi_to_html, but all escape sequences are removed rather than converted"
+    return b"".join([HTML_HEADER, _html_escape(ANSI_REGEX_BYTES.sub(b"", ansi)), HTML_FOOTER])
@@ -3,6 +3,7 @@ import json
 import os
 import re
 import signal
+import sys
 import threading
 import traceback
 from dataclasses import dataclass
@@ -38,6 +39,13 @@ SURROGATE_DIFF = stringc("task reports changed=true but does not report any diff
 
 _DELEGATION_HOST_LABEL = re.compile(r"^(\S+) -> \S+$")
 
+# these are built once rather than once per result
+_DEBUG_ACTIONS = frozenset(add_internal_fqcns(["debug"]))
+_SKIPPED_INFO_KEYS = frozenset(
+    ["skip_reason", "skipped_reason", "true_condition", "false_condition"]
+)
+_NOT_PASSED_TO_DEDUPED_RESULT_KEYS = frozenset(["exception", "warnings", "deprecations"])
+
 display = Display()
 
 _DIFF_FILTERS = {}
@@ -270,7 +278,6 @@ class DedupeCallback(CallbackBase):
                 fake_result_id = ResultID(hostname, None)
                 self.result_id2status[fake_result_id] = "interrupted"
                 self.status2result_ids["interrupted"].append(fake_result_id)
-            del self.running_hosts
             self.running_hosts = set()
             self.__maybe_task_end()
             self.deduped_playbook_on_end()
@@ -295,6 +302,7 @@ class DedupeCallback(CallbackBase):
         self.diff_grouper = None
         self.result_gist_grouper = None
         self.result_stripped_status = None
+        self.formatted_diffs = None
         # the above data is set/reset at the start of each task
         # don't try to access above data before the 1st task has started
         self.first_task_started = False
@@ -311,9 +319,7 @@ class DedupeCallback(CallbackBase):
         self.task_name = task.get_name()
         self.task_is_loop = bool(task.loop)
         self.task_end_done = False
-        del self.running_hosts
         self.running_hosts = set()
-        del self.status2result_ids
         self.status2result_ids = {
             "ok": [],
             "changed": [],
@@ -323,18 +329,16 @@ class DedupeCallback(CallbackBase):
             "ignored": [],
             "interrupted": [],
         }
-        del self.result_id2status
         self.result_id2status = {}
-        del self.diff_grouper
-        del self.result_gist_grouper
         self.diff_grouper = Grouper(DiffID)
         self.result_gist_grouper = Grouper(ResultID)
+        self.formatted_diffs = {}
         if not self.first_task_started:
             self.first_task_started = True
 
     @beartype
     def __runner_start(self, host: Host, task: Task):
-        hostname = host.get_name()
+        hostname = sys.intern(host.get_name())
         if not task.loop:
             self.running_hosts.add(hostname)
         self.__update_status_totals()
@@ -369,21 +373,19 @@ class DedupeCallback(CallbackBase):
 
     @beartype
     def __process_result(self, result: TaskResult, status: str):
-        hostname = CallbackBase.host_label(result)
+        # the same few hostnames are hashed and compared many times per task, and host_label
+        # builds a new string for delegated tasks
+        hostname = sys.intern(CallbackBase.host_label(result))
         item_label = self._make_item_label(result)
         result_id = ResultID(hostname, item_label)
 
         if status == "skipped" and "msg" not in result._result:
-            skipped_info = {
-                k: v
-                for k, v in result._result.items()
-                if k in ["skip_reason", "skipped_reason", "true_condition", "false_condition"]
-            }
+            skipped_info = {k: v for k, v in result._result.items() if k in _SKIPPED_INFO_KEYS}
             result._result["msg"] = json.dumps(skipped_info)
 
         # debug var=... is a special case
         if (
-            result.task_name in add_internal_fqcns(["debug"])
+            result.task_name in _DEBUG_ACTIONS
             and "msg" not in result._result
             and "var" in result._task.args
         ):
@@ -413,7 +415,7 @@ class DedupeCallback(CallbackBase):
                 if filters := _DIFF_FILTERS.get(gist["task_action"], None):
                     for _filter in filters:
                         _filter(diff)
-                formatted_diff = self._get_diff(diff).strip()
+                formatted_diff = self.__format_diff(diff)
                 if formatted_diff:
                     formatted_diffs.append(_anonymize(hostname, item_label, formatted_diff))
             # convert result message to a diff unless it is printed as nothing
@@ -440,15 +442,27 @@ class DedupeCallback(CallbackBase):
         stripped_result_dict = {
             k: v
             for k, v in result._result.items()
-            if k not in ["exception", "warnings", "deprecations"]
+            if k not in _NOT_PASSED_TO_DEDUPED_RESULT_KEYS
         }
         self.deduped_result(result_id, stripped_result_dict, gist, gist_dupes)
         self.__update_status_totals()
 
+    @beartype
+    def __format_diff(self, diff: dict) -> str:
+        """
+        many hosts often return the same diff, and the diff formatter may be an external program,
+        so each distinct diff is only formatted once per task. equal diffs have equal canonical
+        JSON, which is used as the key directly rather than a digest of it
+        """
+        diff_key = json.dumps(diff, sort_keys=True, default=str)
+        if diff_key not in self.formatted_diffs:
+            self.formatted_diffs[diff_key] = self._get_diff(diff).strip()
+        return self.formatted_diffs[diff_key]
+
     @beartype
     def __update_status_totals(self, final=False):
         status_totals = {
-            status: str(len(result_ids)) for status, result_ids in self.status2result_ids.items()
+            status: len(result_ids) for status, result_ids in self.status2result_ids.items()
         }
         # I have to work around this edge case because _runner_on_completed removes hostname
         # from the running_hosts list, and the same host can't be removed multiple times.
@@ -456,9 +470,9 @@ class DedupeCallback(CallbackBase):
         # it could be removed multiple times, but I don't because the loop variable has not
         # been evaluated.
         if self.task_is_loop:
-            status_totals["running"] = "?"
+            status_totals["running"] = None
         else:
-            status_totals["running"] = str(len(self.running_hosts))
+            status_totals["running"] = len(self.running_hosts)
         self.deduped_update_status_totals(status_totals, final=final)
 
     @beartype
@@ -664,11 +678,13 @@ class DedupeCallback(CallbackBase):
         "see ansible.plugins.callback.CallbackBase.v2_playbook_on_vars_prompt"
 
     @beartype
-    def deduped_update_status_totals(self, status_totals: dict[str, str], final=False) -> None:
+    def deduped_update_status_totals(
+        self, status_totals: dict[str, int | None], final=False
+    ) -> None:
         """
-        status_totals: dictionary from status to a string representing the total number of runners
-        or runner items that have that status. the total is usually digits, but it will have
-        the value "?" when using a loop. see dedupe_callback.VALID_STATUSES
+        status_totals: dictionary from status to the total number of runners or runner items that
+        have that status. the total for "running" is None when using a loop, since it isn't known.
+        see dedupe_callback.VALID_STATUSES
         """
 
     @beartype
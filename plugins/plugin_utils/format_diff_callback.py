@@ -1,4 +1,3 @@
-import re
 import shutil
 import subprocess
 import tempfile
@@ -6,11 +5,10 @@ import shlex
 
 from ansible.utils.display import Display
 from ansible.plugins.callback import CallbackBase
+from ansible_collections.unity.general.plugins.plugin_utils.color import decolorize
 
 display = Display()
 
-ANSI_REGEX = re.compile(r"\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])")
-
 
 class FormatDiffCallback(CallbackBase):
     def _get_diff(self, diff_or_diffs: dict | list[dict]) -> str:
@@ -26,7 +24,7 @@ class FormatDiffCallback(CallbackBase):
             display.warning(f'diff formatter "{formatter}" not found')
             return normal_diff
 
-        monochrome_diff = re.sub(ANSI_REGEX, "", normal_diff)
+        monochrome_diff = decolorize(normal_diff)
         # Popen.communicate() and subprocess.run() were having deadlock issues
         with tempfile.TemporaryFile(mode="w+") as tmp_in:
             with tempfile.TemporaryFile(mode="w+") as tmp_out:
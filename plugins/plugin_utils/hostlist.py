@@ -1,22 +1,35 @@
+import functools
+
 from ansible.inventory.host import Host
 from ansible.utils.display import Display
 
 display = Display()
 
-try:
-    from ClusterShell.NodeSet import NodeSet
-
-    DO_NODESET = True
 
-except ImportError:
-    display.warning("unable to import clustershell. hostname lists will not be folded.")
+@functools.lru_cache(maxsize=None)
+def _get_nodeset_class():
+    """
+    clustershell is imported the first time a list of hostnames is formatted rather than when
+    the callback is loaded
+    returns None if clustershell is not installed
+    """
+    try:
+        from ClusterShell.NodeSet import NodeSet
 
-    DO_NODESET = False
+        return NodeSet
+    except ImportError:
+        display.warning("unable to import clustershell. hostname lists will not be folded.")
+        return None
 
 
 def format_hostnames(hosts: list[str | Host]) -> str:
-    hosts = [str(x) for x in hosts]
-    if DO_NODESET:
-        return str(NodeSet.fromlist(sorted(list(hosts))))
+    return _format_hostnames(frozenset(str(x) for x in hosts))
+
+
+# the same groups of hosts come up task after task, so don't sort and fold them every time
+@functools.lru_cache(maxsize=1024)
+def _format_hostnames(hosts: frozenset[str]) -> str:
+    if (nodeset_class := _get_nodeset_class()) is not None:
+        return str(nodeset_class.fromlist(sorted(hosts)))
     else:
-        return ",".join(sorted(list(hosts)))
+        return ",".join(sorted(hosts))
@@ -0,0 +1,12 @@
+import functools
+
+
+@functools.lru_cache(maxsize=None)
+def get_web_client(token: str):
+    """
+    one slack_sdk WebClient per token for the life of the process, rather than one per message
+    slack_sdk is imported on first use since it is slow to import
+    """
+    from slack_sdk import WebClient
+
+    return WebClient(token=token)
@@ -0,0 +1,11 @@
+from ansible_collections.unity.general.plugins.filter.slurm_node_specs import _merge
+
+
+def test_merge_lists():
+    assert _merge({"a": ["x", "y"]}, {"a": ["y", "z"]}) == {"a": ["x", "y", "z"]}
+
+
+def test_merge_lists_mixed_hashable_and_unhashable():
+    assert _merge({"a": ["x"]}, {"a": [{"k": 1}]}) == {"a": ["x", {"k": 1}]}
+    assert _merge({"a": [{"k": 1}]}, {"a": ["x", {"k": 1}]}) == {"a": [{"k": 1}, "x"]}
+    assert _merge({"a": ["x", ["y"]]}, {"a": [["y"], "z"]}) == {"a": ["x", ["y"], "z"]}
@@ -0,0 +1,21 @@
+from ansible_collections.unity.general.plugins.plugin_utils.buffered_callback import (
+    Display2Buffer,
+)
+
+
+def test_append_drops_oldest_lines():
+    display_buffer = Display2Buffer(max_bytes=10)
+    display_buffer._append(b"aaaaaaaaa\nbbbbbbbbb\nccc\n")
+    assert display_buffer.buffer == b"ccc\n"
+    assert display_buffer.num_bytes_dropped == 20
+
+
+def test_append_without_newline_does_not_split_utf8():
+    display_buffer = Display2Buffer(max_bytes=10)
+    text = "é€😀" * 10
+    for character in text:
+        display_buffer._append(character.encode("utf8"))
+    decoded = display_buffer.buffer.decode("utf8")
+    assert text.endswith(decoded)
+    assert len(display_buffer.buffer) <= 10 * 5 // 4
+    assert display_buffer.num_bytes_dropped + len(display_buffer.buffer) == len(text.encode())
@@ -0,0 +1,40 @@
+import pytest
+
+from ansible_collections.unity.general.plugins.plugin_utils.color import (
+    HTML_FOOTER,
+    HTML_HEADER,
+    ansi_to_html,
+    ansi_to_plain_html,
+)
+
+
+def _body(ansi: bytes) -> bytes:
+    html = ansi_to_html(ansi)
+    assert html.startswith(HTML_HEADER) and html.endswith(HTML_FOOTER)
+    return html[len(HTML_HEADER) : -len(HTML_FOOTER)]
+
+
+@pytest.mark.parametrize(
+    "ansi,expected",
+    [
+        (b"\x1b[4:3mx", b'<span style="text-decoration:underline;">x</span>'),
+        (b"\x1b[38:5:196mx", b'<span style="color:#ff0000;">x</span>'),
+        (b"\x1b[38:2::1:2:3mx", b'<span style="color:#010203;">x</span>'),
+        (b"\x1b[>4;2mx", b"x"),
+        (b"\x1b[?1mx", b"x"),
+    ],
+)
+def test_ansi_to_html_uncommon_sgr_parameters(ansi, expected):
+    assert _body(ansi) == expected
+
+
+def test_ansi_to_html_sgr():
+    assert _body(b"\x1b[1;31mx\x1b[0my <z>") == (
+        b'<span style="color:#cd0000;font-weight:bold;">x</span>y &lt;z&gt;'
+    )
+
+
+def test_ansi_to_plain_html():
+    assert ansi_to_plain_html(bytearray(b"\x1b[1;31mx\x1b[0m <y>")) == (
+        HTML_HEADER + b"x &lt;y&gt;" + HTML_FOOTER
+    )